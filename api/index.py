@@ -3,204 +3,301 @@ Vercel Serverless 入口 — 加密货币仪表盘
 Playwright 在 Vercel 上不可用，NUPL/MVRV 使用备选方案
 """
 
-import json
+import asyncio
+import copy
+import functools
+import gzip
+import math
+import os
 import time
 import re
-import requests
+import zlib
+import httpx
 import numpy as np
-import pandas as pd
-from datetime import datetime, timezone, timedelta
+import orjson
+from datetime import date, datetime, timezone, timedelta
 from pathlib import Path
-from bs4 import BeautifulSoup
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, Response
+from lxml import html as lxml_html
+
+from api.signals import ahr999_zone, fgi_zone
+
+# numba 内核需显式开启 (USE_NUMBA=1)：线上不安装 numba，默认不在导入时改环境变量或尝试导入
+njit = None
+if os.environ.get("USE_NUMBA") == "1":
+    os.environ.setdefault("NUMBA_CACHE_DIR", "/tmp/numba_cache")  # Vercel 上唯一可写目录
+    try:
+        from numba import njit
+    except ImportError:
+        pass
 
-app = FastAPI()
 CST = timezone(timedelta(hours=8))
 HEADERS = {
     "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) "
                   "AppleWebKit/537.36 (KHTML, like Gecko) Chrome/131.0.0.0 Safari/537.36"
 }
 
-_cache = {"data": None, "ts": 0}
-CACHE_TTL = 300  # 5分钟缓存
+# body: 编码好的报告 JSON；market: K 线/ETF/链上等慢变数据；derivs: 资金费率/OI 等快变数据
+_cache = {"body": None, "ts": 0, "market": None, "market_ts": 0, "derivs": None, "derivs_ts": 0}
+CACHE_TTL = 300  # 慢变数据 5 分钟
+FAST_TTL = 60    # 快变数据 1 分钟
+_refresh_task: asyncio.Task | None = None
+_refresh_forced = False     # 进行中的任务是否为强制刷新
+_refresh_failed_at = 0.0    # 上次采集失败的 monotonic 时间
+REFRESH_COOLDOWN = 30       # 采集失败后的冷却秒数，期间过期请求不再触发后台刷新
+SNAPSHOT_PATH = Path("/tmp/report.json.gz")  # Vercel 上唯一可写目录，跨冷启动保留
+
+_client: httpx.AsyncClient | None = None
+
+
+def get_client() -> httpx.AsyncClient:
+    """进程内共享的 HTTP 连接池，跨请求复用 TCP/TLS 连接"""
+    global _client
+    if _client is None or _client.is_closed:
+        # HTTP/2 下同一 host 的并发请求复用一条连接多路传输
+        _client = httpx.AsyncClient(
+            headers={**HEADERS, "Accept-Encoding": "br, gzip"}, timeout=15,
+            transport=httpx.AsyncHTTPTransport(
+                http2=True, retries=2,
+                limits=httpx.Limits(max_connections=16, max_keepalive_connections=8,
+                                    keepalive_expiry=60)),
+        )
+    return _client
 
 
 # ── 数据采集 (精简版，无 Playwright) ──────────────────────
 
-def fetch_klines(symbol: str, days: int = 365) -> pd.DataFrame:
-    url = "https://api.binance.com/api/v3/klines"
-    all_data = []
-    end_time = int(time.time() * 1000)
+KLINES_URL = "https://api.binance.com/api/v3/klines"
+DAY_MS = 86_400_000
+
+
+async def _fetch_klines_window(client, symbol, end_time, limit):
+    params = {"symbol": symbol, "interval": "1d", "endTime": end_time, "limit": limit}
+    r = await client.get(KLINES_URL, params=params)
+    if r.status_code == 451:
+        # Binance 屏蔽美国 IP，尝试备用域名
+        r = await client.get(KLINES_URL.replace("api.binance.com", "data-api.binance.vision"),
+                             params=params)
+    r.raise_for_status()
+    return orjson.loads(r.content)
+
+
+async def fetch_klines(client: httpx.AsyncClient, symbol: str, days: int = 365) -> np.ndarray:
+    """按时间升序的 float64 收盘价"""
+    # 预先切好每批 1000 根的 endTime 窗口，并发请求后按 open_time 拼接
+    windows = []
+    end_time = time.time_ns() // 1_000_000
     remaining = days
     while remaining > 0:
         limit = min(remaining, 1000)
-        r = requests.get(url, params={"symbol": symbol, "interval": "1d",
-                                       "endTime": end_time, "limit": limit},
-                         headers=HEADERS, timeout=15)
-        if r.status_code == 451:
-            # Binance 屏蔽美国 IP，尝试备用域名
-            r = requests.get(url.replace("api.binance.com", "data-api.binance.vision"),
-                             params={"symbol": symbol, "interval": "1d",
-                                     "endTime": end_time, "limit": limit},
-                             headers=HEADERS, timeout=15)
-        r.raise_for_status()
-        data = r.json()
-        if not data:
-            break
-        all_data = data + all_data
-        end_time = data[0][0] - 1
-        remaining -= len(data)
-        if len(data) < limit:
-            break
-    df = pd.DataFrame(all_data, columns=[
-        "open_time", "open", "high", "low", "close", "volume",
-        "close_time", "quote_volume", "trades", "taker_buy_base",
-        "taker_buy_quote", "ignore"
-    ])
-    for col in ["close", "open", "high", "low", "volume"]:
-        df[col] = df[col].astype(float)
-    return df
-
-
-def calc_indicators(df):
-    close = df["close"]
-    current = close.iloc[-1]
-    mas = {}
-    for name, p in {"MA30": 30, "MA40": 40, "MA120": 120, "MA200": 200, "MA365": 365}.items():
-        mas[name] = round(float(close.rolling(p).mean().iloc[-1]), 2) if len(close) >= p else None
-    change_60d = round(float((current - close.iloc[-61]) / close.iloc[-61] * 100), 2) if len(close) > 60 else None
-    return {"price": round(float(current), 2), "mas": mas, "change_60d": change_60d}
-
-
-def calc_ahr999(df):
-    try:
-        close = df["close"]
-        current = float(close.iloc[-1])
-        cost = float(close.iloc[-200:].mean()) if len(close) >= 200 else float(close.mean())
-        days = (datetime.now() - datetime(2009, 1, 3)).days
-        exp_val = 10 ** (5.84 * np.log10(days) - 17.01)
-        return round(float((current / cost) * (current / exp_val)), 4)
-    except Exception:
-        return None
+        windows.append((end_time, limit))
+        end_time -= limit * DAY_MS
+        remaining -= limit
+    batches = await asyncio.gather(
+        *(_fetch_klines_window(client, symbol, end, limit) for end, limit in windows))
+    # open_time 只用来去重排序，最终只保留 close，其余 10 列不解析
+    closes = {row[0]: row[4] for batch in batches for row in batch}
+    return np.fromiter((float(closes[t]) for t in sorted(closes)),
+                       dtype=np.float64, count=len(closes))
 
 
-def fetch_24h(symbol):
-    try:
-        r = requests.get("https://api.binance.com/api/v3/ticker/24hr",
-                         params={"symbol": symbol}, headers=HEADERS, timeout=10)
-        return round(float(r.json()["priceChangePercent"]), 2)
-    except Exception:
-        return None
+MA_PERIODS = {"MA30": 30, "MA40": 40, "MA120": 120, "MA200": 200, "MA365": 365}
+_MA_ARRAY = np.array(list(MA_PERIODS.values()), dtype=np.int64)
 
 
-def fetch_fng():
-    try:
-        r = requests.get("https://api.alternative.me/fng/", params={"limit": 1}, timeout=10)
-        d = r.json()["data"][0]
-        return {"value": int(d["value"]), "label": d["value_classification"]}
-    except Exception:
-        return {"value": 0, "label": "N/A"}
+def _tail_means(close, periods):
+    """每个周期只求最后一个均线值：close 尾部 p 个元素的均值"""
+    out = np.empty(periods.size)
+    for i in range(periods.size):
+        p = periods[i]
+        s = 0.0
+        for j in range(close.size - p, close.size):
+            s += close[j]
+        out[i] = s / p
+    return out
 
 
-def fetch_funding():
-    try:
-        r = requests.get("https://fapi.binance.com/fapi/v1/premiumIndex",
-                         params={"symbol": "BTCUSDT"}, timeout=10)
-        return round(float(r.json()["lastFundingRate"]) * 100, 4)
-    except Exception:
-        return None
+if njit is not None:
+    tail_means = njit(cache=True, fastmath=True)(_tail_means)
+else:
+    def tail_means(close, periods):
+        return np.array([close[-p:].mean() for p in periods])
 
 
-def fetch_oi(price):
-    try:
-        r = requests.get("https://fapi.binance.com/fapi/v1/openInterest",
-                         params={"symbol": "BTCUSDT"}, timeout=10)
-        oi = float(r.json()["openInterest"])
-        return {"oi_btc": round(oi, 2), "oi_usd": round(oi * price, 2)}
-    except Exception:
-        return {"oi_btc": None, "oi_usd": None}
+def calc_indicators(close: np.ndarray):
+    current = close[-1]
+    # 只需要最后一个均线值，直接对尾部切片求均值，不必构造整条 rolling 序列
+    means = tail_means(close, np.minimum(_MA_ARRAY, close.size))
+    mas = {name: round(float(m), 2) if close.size >= p else None
+           for (name, p), m in zip(MA_PERIODS.items(), means)}
+    # 日线最后两根收盘价即 24h 涨跌的近似，省掉两次 ticker 请求
+    change_24h = round(float((current / close[-2] - 1) * 100), 2) if close.size >= 2 else None
+    change_60d = round(float((current - close[-61]) / close[-61] * 100), 2) if close.size > 60 else None
+    return {"price": round(float(current), 2), "mas": mas,
+            "change_24h": change_24h, "change_60d": change_60d}
+
+
+_BTC_GENESIS_ORDINAL = date(2009, 1, 3).toordinal()  # AHR999 币龄起点
 
 
-def fetch_etf():
+@functools.lru_cache(maxsize=2)
+def _exp_val(day_ordinal: int) -> float:
+    """AHR999 指数增长估值，按天变化，按日序号缓存"""
+    days = day_ordinal - _BTC_GENESIS_ORDINAL
+    return 10 ** (5.84 * math.log10(days) - 17.01)
+
+
+def calc_ahr999(close: np.ndarray):
     try:
-        r = requests.get("https://farside.co.uk/bitcoin-etf-flow-all-data",
-                         headers=HEADERS, timeout=15)
-        soup = BeautifulSoup(r.text, "lxml")
-        table = soup.find_all("table")[1]
-        rows = table.find_all("tr")
-        header = [h.text.strip() for h in rows[0].find_all(["th", "td"])]
-        ti = header.index("Total") if "Total" in header else -1
-
-        def pv(t):
-            t = t.replace(",", "").strip()
-            if not t or t == "-": return 0.0
-            if t.startswith("(") and t.endswith(")"): return -float(t[1:-1])
-            return float(t)
-
-        data_rows = []
-        for row in rows[1:]:
-            cells = row.find_all("td")
-            if not cells: continue
-            dt = cells[0].text.strip()
-            if any(x in dt for x in ["Total", "Average", "Maximum", "Minimum"]): continue
-            data_rows.append(cells)
-
-        if not data_rows: return None
-        latest = data_rows[-1]
-        date_str = latest[0].text.strip()
-        total = pv(latest[ti].text) if ti >= 0 and ti < len(latest) else 0
-        r5 = sum(pv(r[ti].text) if ti < len(r) else 0 for r in data_rows[-5:])
-        return {"date": date_str, "daily_flow_m": round(total, 1), "recent_5d_flow_m": round(r5, 1)}
+        current = float(close[-1])
+        cost = float(close[-200:].mean()) if close.size >= 200 else float(close.mean())
+        exp_val = _exp_val(date.today().toordinal())
+        return round(float((current / cost) * (current / exp_val)), 4)
     except Exception:
         return None
 
 
-def collect():
-    btc_df = fetch_klines("BTCUSDT", 365)
-    btc = calc_indicators(btc_df)
-    eth_df = fetch_klines("ETHUSDT", 365)
-    eth = calc_indicators(eth_df)
-    btc["change_24h"] = fetch_24h("BTCUSDT")
-    eth["change_24h"] = fetch_24h("ETHUSDT")
+_failures: dict[tuple, tuple[float, Exception]] = {}
 
-    fng = fetch_fng()
-    etf = fetch_etf()
-    oi = fetch_oi(btc["price"])
-    funding = fetch_funding()
-    ahr999 = calc_ahr999(btc_df)
 
-    onchain = {"ahr999": ahr999, "nupl": None, "mvrv": None, "mvrv_zscore": None,
-               "market_cap": None}
+def with_failure_cache(cooldown: float = 60, default=None):
+    """熔断：请求失败后 cooldown 秒内直接返回 default，不再重复等待超时"""
+    def decorator(fn):
+        @functools.wraps(fn)
+        async def wrapper(client, *args):
+            key = (fn.__name__, *args)
+            failed = _failures.get(key)
+            if failed and time.monotonic() - failed[0] < cooldown:
+                return copy.copy(default)
+            try:
+                result = await fn(client, *args)
+            except Exception as e:
+                _failures[key] = (time.monotonic(), e)
+                return copy.copy(default)
+            _failures.pop(key, None)
+            return result
+        return wrapper
+    return decorator
 
-    # 从 GitHub 获取 Playwright 采集的链上数据
-    try:
-        r = requests.get(
-            "https://raw.githubusercontent.com/bourlierbigus-lgtm/crypto-dashboard/main/data/onchain.json",
-            timeout=5)
-        if r.ok:
-            gh_data = r.json()
-            onchain["nupl"] = gh_data.get("nupl")
-            onchain["mvrv"] = gh_data.get("mvrv")
-            onchain["mvrv_zscore"] = gh_data.get("mvrv_zscore")
-            if gh_data.get("market_cap"):
-                onchain["market_cap"] = gh_data["market_cap"]
-            if gh_data.get("realized_cap"):
-                onchain["realized_cap"] = gh_data["realized_cap"]
-    except Exception:
-        pass
 
-    # fallback: blockchain.info market cap
-    if not onchain.get("market_cap"):
-        try:
-            r = requests.get("https://api.blockchain.info/charts/market-cap",
-                             params={"timespan": "1days", "format": "json"}, timeout=10)
-            if r.ok:
-                vals = r.json().get("values", [])
-                if vals:
-                    onchain["market_cap"] = vals[-1]["y"]
-        except Exception:
-            pass
+@with_failure_cache(default={"value": 0, "label": "N/A"})
+async def fetch_fng(client):
+    r = await client.get("https://api.alternative.me/fng/", params={"limit": 1}, timeout=10)
+    d = orjson.loads(r.content)["data"][0]
+    return {"value": int(d["value"]), "label": d["value_classification"]}
+
+
+@with_failure_cache()
+async def fetch_funding(client):
+    r = await client.get("https://fapi.binance.com/fapi/v1/premiumIndex",
+                         params={"symbol": "BTCUSDT"}, timeout=10)
+    return round(float(orjson.loads(r.content)["lastFundingRate"]) * 100, 4)
+
+
+@with_failure_cache()
+async def fetch_oi_raw(client):
+    r = await client.get("https://fapi.binance.com/fapi/v1/openInterest",
+                         params={"symbol": "BTCUSDT"}, timeout=10)
+    return float(orjson.loads(r.content)["openInterest"])
+
+
+_ETF_SKIP = re.compile(r"Total|Average|Maximum|Minimum")
+_NEG = re.compile(r"^\((.*)\)$")
+
+
+def pv(t):
+    """解析 Farside 金额，括号表示净流出"""
+    t = t.replace(",", "").strip()
+    if not t or t == "-": return 0.0
+    m = _NEG.match(t)
+    return -float(m.group(1)) if m else float(t)
+
+
+@with_failure_cache()
+async def fetch_etf(client):
+    r = await client.get("https://farside.co.uk/bitcoin-etf-flow-all-data")
+    table = lxml_html.fromstring(r.content).xpath("//table")[1]
+    rows = table.xpath(".//tr")
+    header = [h.text_content().strip() for h in rows[0].xpath("./th|./td")]
+    ti = header.index("Total") if "Total" in header else -1
+
+    # 不引入 pandas（冷启动成本），改为从表尾倒序扫描：跳过汇总行，凑够最近 5 个交易日即停，
+    # 每行只取日期和 Total 两个单元格，不必遍历整张历史表
+    recent = []
+    for row in reversed(rows[1:]):
+        cells = row.xpath("./td")
+        if not cells: continue
+        dt = cells[0].text_content().strip()
+        if _ETF_SKIP.search(dt): continue
+        recent.append((dt, cells[ti].text_content() if 0 <= ti < len(cells) else ""))
+        if len(recent) == 5: break
+
+    if not recent: return None
+    date_str, total = recent[0]
+    r5 = sum(pv(t) for _, t in recent)
+    return {"date": date_str, "daily_flow_m": round(pv(total), 1), "recent_5d_flow_m": round(r5, 1)}
+
+
+@with_failure_cache()
+async def fetch_github_onchain(client):
+    """从 GitHub 获取 Playwright 采集的链上数据"""
+    r = await client.get(
+        "https://raw.githubusercontent.com/bourlierbigus-lgtm/crypto-dashboard/main/data/onchain.json",
+        timeout=5)
+    r.raise_for_status()
+    return orjson.loads(r.content)
+
+
+@with_failure_cache()
+async def fetch_market_cap(client):
+    """fallback: blockchain.info market cap"""
+    r = await client.get("https://api.blockchain.info/charts/market-cap",
+                         params={"timespan": "1days", "format": "json"}, timeout=10)
+    r.raise_for_status()
+    vals = orjson.loads(r.content).get("values", [])
+    return vals[-1]["y"] if vals else None
+
+
+async def collect_market(client):
+    """慢变数据：K 线指标、恐慌贪婪、ETF、链上"""
+    btc_close, eth_close, fng, etf, gh = await asyncio.gather(
+        fetch_klines(client, "BTCUSDT", 365), fetch_klines(client, "ETHUSDT", 365),
+        fetch_fng(client), fetch_etf(client), fetch_github_onchain(client),
+        return_exceptions=True)
+    # K 线是核心数据，失败直接抛出；其余 fetch_* 内部已兜底
+    for res in (btc_close, eth_close):
+        if isinstance(res, BaseException):
+            raise res
+    market_cap = (gh or {}).get("market_cap") or await fetch_market_cap(client)
+
+    ahr999 = calc_ahr999(btc_close)
+    onchain = {"ahr999": ahr999, "nupl": None, "mvrv": None, "mvrv_zscore": None,
+               "market_cap": market_cap}
+    if gh:
+        onchain["nupl"] = gh.get("nupl")
+        onchain["mvrv"] = gh.get("mvrv")
+        onchain["mvrv_zscore"] = gh.get("mvrv_zscore")
+        if gh.get("realized_cap"):
+            onchain["realized_cap"] = gh["realized_cap"]
+    return {"btc": calc_indicators(btc_close), "eth": calc_indicators(eth_close),
+            "fear_greed": fng, "etf": etf, "onchain": onchain}
+
+
+async def collect_derivs(client):
+    """快变数据：资金费率、合约持仓"""
+    funding, oi_raw = await asyncio.gather(fetch_funding(client), fetch_oi_raw(client))
+    return {"funding_rate": funding, "oi_raw": oi_raw}
+
+
+def build_report(market, derivs):
+    btc, eth = market["btc"], market["eth"]
+    fng, etf, onchain = market["fear_greed"], market["etf"], market["onchain"]
+    ahr999 = onchain["ahr999"]
+    funding, oi_raw = derivs["funding_rate"], derivs["oi_raw"]
+    oi = ({"oi_btc": round(oi_raw, 2), "oi_usd": round(oi_raw * btc["price"], 2)}
+          if oi_raw is not None else {"oi_btc": None, "oi_usd": None})
 
     signals = []
     ma200 = btc["mas"].get("MA200")
@@ -208,18 +305,11 @@ def collect():
         signals.append({"icon": "check" if btc["price"] >= ma200 else "warn",
                          "text": f"BTC 价格{'高于' if btc['price'] >= ma200 else '低于'} MA200"})
     if ahr999 is not None:
-        if ahr999 < 0.45:
-            signals.append({"icon": "red", "text": f"AHR999 = {ahr999:.4f} < 0.45 (抄底区间)"})
-        elif ahr999 < 1.2:
-            signals.append({"icon": "yellow", "text": f"AHR999 = {ahr999:.4f} (定投区间)"})
-        else:
-            signals.append({"icon": "green", "text": f"AHR999 = {ahr999:.4f} > 1.2 (观望区间)"})
+        icon, zone = ahr999_zone(ahr999)
+        signals.append({"icon": icon, "text": f"AHR999 = {ahr999:.4f} {zone}"})
     v = fng["value"]
-    if v <= 25: signals.append({"icon": "red", "text": f"市场极度恐慌 (FGI={v})"})
-    elif v <= 45: signals.append({"icon": "yellow", "text": f"市场恐慌 (FGI={v})"})
-    elif v <= 55: signals.append({"icon": "neutral", "text": f"市场中性 (FGI={v})"})
-    elif v <= 75: signals.append({"icon": "green", "text": f"市场贪婪 (FGI={v})"})
-    else: signals.append({"icon": "red", "text": f"市场极度贪婪 (FGI={v})"})
+    icon, label = fgi_zone(v)
+    signals.append({"icon": icon, "text": f"{label} (FGI={v})"})
     if funding is not None and funding < -0.01:
         signals.append({"icon": "red", "text": f"资金费率为负 ({funding}%)，空头占优"})
     if etf and etf.get("recent_5d_flow_m") is not None:
@@ -237,42 +327,155 @@ def collect():
     }
 
 
-def sanitize(obj):
-    if isinstance(obj, dict): return {k: sanitize(v) for k, v in obj.items()}
-    if isinstance(obj, list): return [sanitize(v) for v in obj]
-    if isinstance(obj, (np.integer,)): return int(obj)
-    if isinstance(obj, (np.floating,)): return float(obj)
-    if isinstance(obj, (np.bool_,)): return bool(obj)
-    return obj
+# ── 缓存刷新 ─────────────────────────────────────────────
+
+async def _collect(force: bool = False):
+    """按字段 TTL 重新采集过期部分，并重建缓存的报告"""
+    now = time.monotonic()
+    client = get_client()
+    jobs = {}
+    if force or _cache["market"] is None or now - _cache["market_ts"] >= CACHE_TTL:
+        jobs["market"] = collect_market(client)
+    if force or _cache["derivs"] is None or now - _cache["derivs_ts"] >= FAST_TTL:
+        jobs["derivs"] = collect_derivs(client)
+    if not jobs:
+        return _cache["body"]
+    for key, val in zip(jobs, await asyncio.gather(*jobs.values())):
+        _cache[key] = val
+        _cache[f"{key}_ts"] = now
+    # 只在刷新时编码一次，请求路径和快照都直接复用这份 bytes
+    _cache["body"] = orjson.dumps(build_report(_cache["market"], _cache["derivs"]),
+                                  option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+    _cache["ts"] = now
+    _save_snapshot(_cache["body"])
+    return _cache["body"]
+
+
+def _on_refresh_done(task: asyncio.Task):
+    global _refresh_failed_at
+    if not task.cancelled() and task.exception() is not None:
+        _refresh_failed_at = time.monotonic()
+        print(f"⚠️ 刷新失败: {task.exception()}")
+
+
+async def _collect_after(prev: asyncio.Task):
+    """等进行中的普通刷新结束，再做一次全量强制采集"""
+    await asyncio.wait([prev])
+    return await _collect(force=True)
+
+
+def _shared_refresh(force: bool = False) -> asyncio.Task:
+    """后台循环、冷启动请求和 /api/refresh 共用同一个进行中的采集任务，避免重复打上游"""
+    global _refresh_task, _refresh_forced
+    # 检查与创建之间没有 await，在事件循环内天然是原子的，无需额外加锁
+    if _refresh_task is None or _refresh_task.done():
+        _refresh_task = asyncio.create_task(_collect(force))
+    elif force and not _refresh_forced:
+        # 进行中的是普通刷新，可能只更新了 derivs；强制刷新排在它后面，不并发打上游
+        _refresh_task = asyncio.create_task(_collect_after(_refresh_task))
+    else:
+        return _refresh_task
+    _refresh_forced = force
+    _refresh_task.add_done_callback(_on_refresh_done)
+    return _refresh_task
+
+
+def _refresh_in_background():
+    """stale-while-revalidate：当前请求直接返回旧数据；刚失败过则先冷却，不反复打挂掉的上游"""
+    if time.monotonic() - _refresh_failed_at >= REFRESH_COOLDOWN:
+        _shared_refresh()
+
+
+async def refresh_cache(force: bool = False):
+    # shield：某个请求断开时不取消其他人也在等的采集任务
+    return await asyncio.shield(_shared_refresh(force))
+
+
+def _save_snapshot(body: bytes):
+    """把最近一次成功的报告落盘，冷启动时先返回它再后台刷新"""
+    tmp = SNAPSHOT_PATH.with_suffix(".tmp")
+    try:
+        with gzip.open(tmp, "wb", compresslevel=3) as f:
+            f.write(body)
+        os.replace(tmp, SNAPSHOT_PATH)
+    except OSError as e:
+        print(f"⚠️ 报告快照写入失败: {e}")
+
+
+def _load_snapshot():
+    try:
+        with gzip.open(SNAPSHOT_PATH, "rb") as f:
+            body = f.read()
+        orjson.loads(body)  # 校验一遍，坏快照不对外返回
+        _cache["body"] = body
+        # 按文件年龄换算到 monotonic 时钟，过期判断与内存缓存一致
+        _cache["ts"] = time.monotonic() - (time.time() - SNAPSHOT_PATH.stat().st_mtime)
+    except (OSError, EOFError, zlib.error, ValueError):
+        pass  # 快照缺失、截断或损坏都当作没有，冷启动照常采集
+
+
+_load_snapshot()
+
+
+async def _refresher():
+    while True:
+        try:
+            await refresh_cache()
+        except Exception:
+            pass  # 已由 _on_refresh_done 打印
+        await asyncio.sleep(FAST_TTL)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    task = asyncio.create_task(_refresher())
+    yield
+    task.cancel()
+    if _client is not None:
+        await _client.aclose()
+
+app = FastAPI(lifespan=lifespan)
 
 
 # ── Routes ───────────────────────────────────────────────
 
-@app.get("/", response_class=HTMLResponse)
-async def index():
+def _read_index_html() -> bytes:
     html_path = Path(__file__).parent.parent / "templates" / "index.html"
     if not html_path.exists():
         html_path = Path(__file__).parent / "templates" / "index.html"
-    return HTMLResponse(html_path.read_text("utf-8"))
+    return html_path.read_bytes()
+
+
+_INDEX_HTML = _read_index_html()  # 模板只在启动时读一次
+
+
+@app.get("/", response_class=HTMLResponse)
+async def index():
+    return HTMLResponse(_INDEX_HTML)
+
+
+def _json(body: bytes) -> Response:
+    # 直接返回预编码的 bytes，跳过 FastAPI 的 jsonable_encoder 和逐请求序列化
+    return Response(body, media_type="application/json")
 
 
 @app.get("/api/report")
 async def report():
-    now = time.time()
-    if _cache["data"] and now - _cache["ts"] < CACHE_TTL:
-        return _cache["data"]
-    try:
-        data = sanitize(collect())
-        _cache["data"] = data
-        _cache["ts"] = now
-        return data
-    except Exception as e:
-        return {"error": str(e), "updated_at": datetime.now(CST).strftime("%Y-%m-%d %H:%M CST")}
+    if _cache["body"] is None:
+        # 冷启动时各部分都为空，普通刷新本来就会全量采集；与 lifespan 后台任务合并，不另起强制刷新
+        try:
+            if time.monotonic() - _refresh_failed_at < REFRESH_COOLDOWN:
+                raise RuntimeError("上游刚刚采集失败，稍后重试")
+            return _json(await refresh_cache())
+        except Exception as e:
+            return _json(orjson.dumps({"error": str(e),
+                                       "updated_at": datetime.now(CST).strftime("%Y-%m-%d %H:%M CST")}))
+    # Vercel 上 lifespan 后台任务不一定常驻，过期时由请求顺带触发后台刷新
+    if time.monotonic() - _cache["ts"] >= FAST_TTL:
+        _refresh_in_background()
+    return _json(_cache["body"])
 
 
 @app.get("/api/refresh")
 async def refresh():
-    data = sanitize(collect())
-    _cache["data"] = data
-    _cache["ts"] = time.time()
-    return data
+    return _json(await refresh_cache(force=True))
@@ -0,0 +1,25 @@
+"""
+信号分档表 — Vercel 入口 (api/index.py) 与本地仪表盘 (app.py) 共用，避免两边阈值不一致
+"""
+
+import bisect
+
+# (上界, icon, 文案)。FGI <= 上界、AHR999 < 上界 即落入该档
+FGI_TABLE = [(25, "red", "市场极度恐慌"), (45, "yellow", "市场恐慌"), (55, "neutral", "市场中性"),
+             (75, "green", "市场贪婪"), (float("inf"), "red", "市场极度贪婪")]
+_FGI_BOUNDS = [t[0] for t in FGI_TABLE]
+AHR_TABLE = [(0.45, "red", "< 0.45 (抄底区间)"), (1.2, "yellow", "(定投区间)"),
+             (float("inf"), "green", "> 1.2 (观望区间)")]
+_AHR_BOUNDS = [t[0] for t in AHR_TABLE]
+
+
+def fgi_zone(v) -> tuple[str, str]:
+    """恐慌贪婪指数 -> (icon, 文案)"""
+    _, icon, label = FGI_TABLE[bisect.bisect_left(_FGI_BOUNDS, v)]
+    return icon, label
+
+
+def ahr999_zone(v) -> tuple[str, str]:
+    """AHR999 -> (icon, 区间说明)"""
+    _, icon, zone = AHR_TABLE[bisect.bisect_right(_AHR_BOUNDS, v)]
+    return icon, zone
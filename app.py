@@ -7,73 +7,72 @@ import asyncio
 from datetime import datetime, timezone, timedelta
 from contextlib import asynccontextmanager
 
-import requests
+import numpy as np
+import orjson
 from fastapi import FastAPI
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, Response
 from pathlib import Path
 
 from crypto_report import (
     fetch_binance_klines, calc_indicators, calc_ahr999,
     fetch_fear_greed, fetch_binance_funding_rate,
     fetch_binance_open_interest, fetch_farside_etf,
-    fetch_onchain_via_browser, HEADERS,
+    fetch_onchain_via_browser, make_client,
 )
+from api.signals import ahr999_zone, fgi_zone
 
 CST = timezone(timedelta(hours=8))
-_cache: dict | None = None
-
-
-def sanitize(obj):
-    """递归将 numpy 类型转为 Python 原生类型，确保 JSON 可序列化"""
-    import numpy as np
-    if isinstance(obj, dict):
-        return {k: sanitize(v) for k, v in obj.items()}
-    if isinstance(obj, list):
-        return [sanitize(v) for v in obj]
-    if isinstance(obj, (np.integer,)):
-        return int(obj)
-    if isinstance(obj, (np.floating,)):
-        return float(obj)
-    if isinstance(obj, (np.bool_,)):
-        return bool(obj)
+_cache: bytes | None = None
+_refresh_task: asyncio.Task | None = None
+_client = None
+
+
+def _get_client():
+    """跨刷新复用同一个连接池，后续采集省掉 TCP/TLS 握手"""
+    global _client
+    if _client is None or _client.is_closed:
+        _client = make_client()
+    return _client
+
+
+def _np_default(obj):
+    """orjson 原生不支持的 numpy 对象兜底（如非连续数组、float16 等）"""
+    if isinstance(obj, np.generic):
+        return obj.item()
     if isinstance(obj, np.ndarray):
         return obj.tolist()
-    return obj
+    raise TypeError
 
 
-def fetch_24h_change(symbol: str) -> float | None:
+def dump_json(obj) -> bytes:
+    """序列化报告，numpy 类型由 orjson 在 C 层直接处理，无需 Python 递归"""
+    return orjson.dumps(obj, default=_np_default, option=orjson.OPT_SERIALIZE_NUMPY)
+
+
+async def _fetch_onchain() -> dict:
     try:
-        r = requests.get(
-            "https://api.binance.com/api/v3/ticker/24hr",
-            params={"symbol": symbol}, headers=HEADERS, timeout=10,
-        )
-        r.raise_for_status()
-        return round(float(r.json()["priceChangePercent"]), 2)
+        return await fetch_onchain_via_browser()
     except Exception:
-        return None
+        return {"nupl": None, "mvrv": None, "mvrv_zscore": None,
+                "market_cap": None, "realized_cap": None}
 
 
-def collect_all_data() -> dict:
+async def collect_all_data() -> bytes:
     print("📡 采集数据中...")
-    btc_df = fetch_binance_klines("BTCUSDT", 365)
+    client = _get_client()
+    btc_df, eth_df, fng, etf, funding, onchain = await asyncio.gather(
+        fetch_binance_klines(client, "BTCUSDT", 365),
+        fetch_binance_klines(client, "ETHUSDT", 365),
+        fetch_fear_greed(client),
+        fetch_farside_etf(client),
+        fetch_binance_funding_rate(client),
+        _fetch_onchain(),
+    )
     btc = calc_indicators(btc_df)
-    eth_df = fetch_binance_klines("ETHUSDT", 365)
     eth = calc_indicators(eth_df)
+    oi = await fetch_binance_open_interest(client, btc["price"])
 
-    btc["change_24h"] = fetch_24h_change("BTCUSDT")
-    eth["change_24h"] = fetch_24h_change("ETHUSDT")
-
-    fng = fetch_fear_greed()
-    etf = fetch_farside_etf()
-    oi = fetch_binance_open_interest(btc["price"])
-    funding = fetch_binance_funding_rate()
     ahr999 = calc_ahr999(btc_df)
-
-    try:
-        onchain = fetch_onchain_via_browser()
-    except Exception:
-        onchain = {"nupl": None, "mvrv": None, "mvrv_zscore": None,
-                   "market_cap": None, "realized_cap": None}
     onchain["ahr999"] = ahr999
 
     signals = build_signals(btc, fng, funding, etf, ahr999)
@@ -82,7 +81,7 @@ def collect_all_data() -> dict:
                  and btc["price"] < btc["mas"]["MA200"])
 
     now = datetime.now(CST)
-    return sanitize({
+    return dump_json({
         "updated_at": now.strftime("%Y-%m-%d %H:%M CST"),
         "btc": btc, "eth": eth,
         "fear_greed": fng, "etf": etf,
@@ -105,24 +104,12 @@ def build_signals(btc, fng, funding, etf, ahr999) -> list[dict]:
         })
 
     if ahr999 is not None:
-        if ahr999 < 0.45:
-            signals.append({"icon": "red", "text": f"AHR999 = {ahr999:.4f} < 0.45 (抄底区间)"})
-        elif ahr999 < 1.2:
-            signals.append({"icon": "yellow", "text": f"AHR999 = {ahr999:.4f} (定投区间)"})
-        else:
-            signals.append({"icon": "green", "text": f"AHR999 = {ahr999:.4f} > 1.2 (观望区间)"})
+        icon, zone = ahr999_zone(ahr999)
+        signals.append({"icon": icon, "text": f"AHR999 = {ahr999:.4f} {zone}"})
 
     v = fng["value"]
-    if v <= 25:
-        signals.append({"icon": "red", "text": f"市场极度恐慌 (FGI={v})"})
-    elif v <= 45:
-        signals.append({"icon": "yellow", "text": f"市场恐慌 (FGI={v})"})
-    elif v <= 55:
-        signals.append({"icon": "neutral", "text": f"市场中性 (FGI={v})"})
-    elif v <= 75:
-        signals.append({"icon": "green", "text": f"市场贪婪 (FGI={v})"})
-    else:
-        signals.append({"icon": "red", "text": f"市场极度贪婪 (FGI={v})"})
+    icon, label = fgi_zone(v)
+    signals.append({"icon": icon, "text": f"{label} (FGI={v})"})
 
     if funding is not None:
         if funding < -0.01:
@@ -140,34 +127,47 @@ def build_signals(btc, fng, funding, etf, ahr999) -> list[dict]:
     return signals
 
 
+async def refresh_cache() -> bytes:
+    """并发的刷新请求合并到同一个进行中的采集任务，避免重复采集"""
+    global _cache, _refresh_task
+    # 检查与创建之间没有 await，在事件循环内天然是原子的，无需额外加锁
+    if _refresh_task is None or _refresh_task.done():
+        _refresh_task = asyncio.create_task(collect_all_data())
+    _cache = await asyncio.shield(_refresh_task)
+    return _cache
+
+
 # ── FastAPI ──────────────────────────────────────────────
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    global _cache
-    _cache = await asyncio.to_thread(collect_all_data)
+    await refresh_cache()
     print("✅ 初始数据采集完成")
     yield
+    if _client is not None:
+        await _client.aclose()
 
 app = FastAPI(lifespan=lifespan)
 
 
+_INDEX_HTML = (Path(__file__).parent / "templates" / "index.html").read_bytes()
+
+
 @app.get("/", response_class=HTMLResponse)
 async def index():
-    html = (Path(__file__).parent / "templates" / "index.html").read_text("utf-8")
-    return HTMLResponse(html)
+    return HTMLResponse(_INDEX_HTML)
 
 
 @app.get("/api/report")
 async def api_report():
-    return _cache or {"error": "数据尚未就绪"}
+    if _cache is None:
+        return {"error": "数据尚未就绪"}
+    return Response(_cache, media_type="application/json")
 
 
 @app.get("/api/refresh")
 async def api_refresh():
-    global _cache
-    _cache = await asyncio.to_thread(collect_all_data)
-    return _cache
+    return Response(await refresh_cache(), media_type="application/json")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,75 @@
+"""
+Playwright 浏览器辅助 — crypto_report.py 与 update_onchain.py 共用
+只依赖标准库和 Playwright，定时采集脚本不必导入 pandas/numpy/httpx
+"""
+
+import os
+import time
+from pathlib import Path
+
+CDP_PORT = int(os.environ.get("CDP_PORT", "9222"))
+CDP_ENDPOINT_FILE = Path("/tmp/cdp_endpoint.txt")  # 常驻浏览器的 CDP 地址 (纯文本 URL)
+# 图表页只需要 Plotly 脚本和数据，图片/字体/样式和广告统计脚本一律拦截
+LAUNCH_ARGS = ["--disable-extensions", "--disable-background-networking",
+               "--blink-settings=imagesEnabled=false"]
+# 调试端口没有鉴权，只监听本机回环地址
+BROWSER_ARGS = [f"--remote-debugging-port={CDP_PORT}", "--remote-debugging-address=127.0.0.1",
+                "--disable-gpu", "--disable-dev-shm-usage", *LAUNCH_ARGS]
+# Playwright 默认关闭 Chromium 沙箱；常驻进程开着调试端口，显式打开沙箱。
+# 只有以 root 运行（通常是容器里）时 Chromium 拒绝启用沙箱，此时才退回 --no-sandbox
+RUNNING_AS_ROOT = hasattr(os, "geteuid") and os.geteuid() == 0
+BLOCKED_RESOURCE_TYPES = {"image", "font", "media", "stylesheet"}
+BLOCKED_URL_PARTS = ("googletag", "doubleclick", "hotjar", "analytics")
+
+
+async def open_browser(p):
+    """优先通过 CDP 连接 serve_browser() 启动的常驻浏览器，连不上再冷启动 Chromium"""
+    if CDP_ENDPOINT_FILE.exists():
+        try:
+            return await p.chromium.connect_over_cdp(CDP_ENDPOINT_FILE.read_text().strip())
+        except Exception as e:
+            print(f"  ⚠️ 常驻浏览器连接失败，改为冷启动: {e}")
+    return await p.chromium.launch(headless=True, args=LAUNCH_ARGS)
+
+
+async def _block_heavy_assets(route):
+    req = route.request
+    if req.resource_type in BLOCKED_RESOURCE_TYPES or any(d in req.url for d in BLOCKED_URL_PARTS):
+        await route.abort()
+    else:
+        await route.continue_()
+
+
+async def open_context(browser):
+    """复用浏览器已有的 context（CDP 常驻浏览器），并在路由层拦截无关资源"""
+    context = browser.contexts[0] if browser.contexts else await browser.new_context()
+    await context.route("**/*", _block_heavy_assets)
+    return context
+
+
+async def grab_plotly_traces(context, url: str, js_extract: str):
+    """在独立标签页打开图表，等 Plotly 渲染出来后提取各条曲线的最新值"""
+    page = await context.new_page()
+    try:
+        # Plotly 渲染远早于 networkidle，DOM 就绪后等图表元素出现即可
+        await page.goto(url, wait_until="domcontentloaded", timeout=30000)
+        await page.wait_for_selector(".js-plotly-plot", timeout=15000)
+        return await page.evaluate(js_extract)
+    finally:
+        await page.close()
+
+
+def serve_browser():
+    """常驻 Chromium 守护进程，省掉每次采集 1-2 秒的浏览器冷启动；端口由环境变量 CDP_PORT 指定"""
+    from playwright.sync_api import sync_playwright
+
+    with sync_playwright() as p:
+        browser = p.chromium.launch(headless=True, args=BROWSER_ARGS,
+                                    chromium_sandbox=not RUNNING_AS_ROOT)
+        CDP_ENDPOINT_FILE.write_text(f"http://127.0.0.1:{CDP_PORT}")
+        print(f"🌐 常驻浏览器已启动，CDP: http://127.0.0.1:{CDP_PORT}")
+        try:
+            while browser.is_connected():
+                time.sleep(60)
+        finally:
+            CDP_ENDPOINT_FILE.unlink(missing_ok=True)
@@ -4,16 +4,24 @@
 数据源: Binance, Alternative.me, Farside Investors, blockchain.info
 """
 
-import requests
+import asyncio
+import gzip
+import hashlib
+import httpx
+import io
+import itertools
 import pandas as pd
 import numpy as np
-import json
+import orjson
+import math
+import os
 import time
 import re
-from datetime import datetime, timezone, timedelta
-from bs4 import BeautifulSoup
+from datetime import date, datetime, timezone, timedelta
 from pathlib import Path
 
+from browser import grab_plotly_traces, open_browser, open_context, serve_browser
+
 # ─── 配置 ───────────────────────────────────────────────
 BINANCE_SPOT = "https://api.binance.com"
 BINANCE_FUTURES = "https://fapi.binance.com"
@@ -25,59 +33,150 @@ HEADERS = {
 }
 
 CST = timezone(timedelta(hours=8))
+REPORTS_DIR = Path(__file__).parent / "reports"
+
+HOUR_MS = 3_600_000
+DAY_MS = 86_400_000
+KLINES_LIMIT = 1000  # Binance 单次请求上限
+KLINE_COLUMNS = [
+    "open_time", "open", "high", "low", "close", "volume",
+    "close_time", "quote_volume", "trades", "taker_buy_base",
+    "taker_buy_quote", "ignore"
+]
+_BTC_GENESIS_ORDINAL = date(2009, 1, 3).toordinal()  # AHR999 币龄起点
+
+# 各数据源的 Redis 缓存时长 (秒)；仅脚本模式通过 enable_redis_cache() 开启
+REDIS_URL = os.environ.get("REDIS_URL", "redis://localhost:6379/0")
+TTL_KLINES = 3600
+TTL_FNG = 3600
+TTL_DERIVS = 60
+TTL_FARSIDE = 6 * 3600
+
+try:
+    import redis.asyncio as aioredis  # 可选依赖，未安装时直接走 HTTP
+except ImportError:
+    aioredis = None
+
+# selectolax 为可选依赖，用来先切出目标表格；1.0 起移除了 Modest 后端，优先用 lexbor
+try:
+    from selectolax.lexbor import LexborHTMLParser as HTMLParser
+except ImportError:
+    try:
+        from selectolax.parser import HTMLParser
+    except ImportError:
+        HTMLParser = None
+
+_redis = None
+_redis_enabled = False  # app.py 等库调用方默认直连上游，拿实时数据
+
+
+def make_client() -> httpx.AsyncClient:
+    """所有采集函数共享的异步 HTTP 客户端：keep-alive 连接池，连接失败自动重试"""
+    # 与 api/index.py 的 get_client 保持一致：HTTP/2 多路复用同一 host 的并发请求
+    return httpx.AsyncClient(
+        headers=HEADERS, timeout=15,
+        transport=httpx.AsyncHTTPTransport(
+            http2=True, retries=2,
+            limits=httpx.Limits(max_connections=16, max_keepalive_connections=8)),
+    )
+
+
+def enable_redis_cache():
+    """脚本多次运行之间复用上游响应；仪表盘要实时数据，不应调用"""
+    global _redis_enabled
+    _redis_enabled = True
+
+
+def _get_redis():
+    global _redis
+    if _redis is None and _redis_enabled and aioredis is not None:
+        _redis = aioredis.from_url(REDIS_URL, socket_timeout=0.5, socket_connect_timeout=0.5)
+    return _redis or None
+
+
+async def cached_get(client: httpx.AsyncClient, url: str, params: dict | None = None,
+                     ttl: int = 60, compress: bool = False) -> bytes:
+    """
+    带 Redis 缓存的 GET，按 (url, params) 缓存响应体 ttl 秒
+    未开启缓存或 Redis 不可用时直接请求，不可用后本进程内不再尝试
+    """
+    global _redis
+    key = "crypto_report:" + hashlib.blake2b(
+        repr((url, sorted((params or {}).items()))).encode(), digest_size=16).hexdigest()
+    r = _get_redis()
+    if r is not None:
+        try:
+            hit = await r.get(key)
+            if hit is not None:
+                return gzip.decompress(hit) if compress else hit
+        except Exception:
+            _redis = r = False
+
+    resp = await client.get(url, params=params)
+    resp.raise_for_status()
+    body = resp.content
+    if r:
+        try:
+            await r.setex(key, ttl, gzip.compress(body) if compress else body)
+        except Exception:
+            _redis = False
+    return body
 
 
 # ═══════════════════════════════════════════════════════════
 # 第一步：数据采集
 # ═══════════════════════════════════════════════════════════
 
-def fetch_binance_klines(symbol: str, days: int = 365) -> pd.DataFrame:
+async def fetch_binance_klines(client: httpx.AsyncClient, symbol: str, days: int = 365) -> pd.DataFrame:
     """从 Binance 获取日线数据"""
     url = f"{BINANCE_SPOT}/api/v3/klines"
-    all_data = []
-    end_time = int(time.time() * 1000)
-    remaining = days
-
-    while remaining > 0:
-        limit = min(remaining, 1000)
-        params = {"symbol": symbol, "interval": "1d", "endTime": end_time, "limit": limit}
-        resp = requests.get(url, params=params, headers=HEADERS, timeout=15)
-        resp.raise_for_status()
-        data = resp.json()
-        if not data:
-            break
-        all_data = data + all_data
-        end_time = data[0][0] - 1
-        remaining -= len(data)
-        if len(data) < limit:
-            break
-
-    df = pd.DataFrame(all_data, columns=[
-        "open_time", "open", "high", "low", "close", "volume",
-        "close_time", "quote_volume", "trades", "taker_buy_base",
-        "taker_buy_quote", "ignore"
-    ])
-    for col in ["close", "open", "high", "low", "volume"]:
-        df[col] = df[col].astype(float)
-    df["date"] = pd.to_datetime(df["open_time"], unit="ms")
-    return df
+    # endTime 取整到小时，缓存键才能在 TTL 内命中；当天 K 线的开盘时间必然 <= 该值
+    end_time = time.time_ns() // 1_000_000 // HOUR_MS * HOUR_MS
+
+    # 每个窗口最多 1000 根，endTime 直接由 now 往前推算，窗口之间无数据依赖，可并发请求
+    async def fetch_window(i: int) -> list:
+        params = {"symbol": symbol, "interval": "1d",
+                  "endTime": end_time - i * KLINES_LIMIT * DAY_MS,
+                  "limit": min(days - i * KLINES_LIMIT, KLINES_LIMIT)}
+        return orjson.loads(await cached_get(client, url, params, ttl=TTL_KLINES))
+
+    batches = await asyncio.gather(*(fetch_window(i) for i in range(math.ceil(days / KLINES_LIMIT))))
+    # 各窗口按 endTime 首尾相接、互不重叠，且窗口内已按时间升序；由旧到新拼接一次即可，无需去重排序
+    all_data = list(itertools.chain.from_iterable(reversed(batches)))
+
+    # 下游只读收盘价，只取 open_time 和 close 两列，其余字段不再转换和保留
+    arr = np.asarray(all_data, dtype=object).reshape(-1, len(KLINE_COLUMNS))
+    open_time = arr[:, KLINE_COLUMNS.index("open_time")].astype(np.int64)
+    return pd.DataFrame({
+        "open_time": open_time,
+        "close": arr[:, KLINE_COLUMNS.index("close")].astype(np.float64),
+        "date": pd.to_datetime(open_time, unit="ms"),
+    })
+
+
+MA_PERIODS = {"MA30": 30, "MA40": 40, "MA120": 120, "MA200": 200, "MA365": 365}
 
 
 def calc_indicators(df: pd.DataFrame) -> dict:
     """计算 MA 和涨幅"""
-    close = df["close"]
-    current = close.iloc[-1]
+    arr = df["close"].to_numpy(dtype=np.float64, copy=False)
+    current = arr[-1]
+
+    # 只需要最新一天的均线值，直接对尾部 period 个收盘价求均值
+    mas = {name: round(float(arr[-period:].mean()), 2) if arr.size >= period else None
+           for name, period in MA_PERIODS.items()}
 
-    ma_periods = {"MA30": 30, "MA40": 40, "MA120": 120, "MA200": 200, "MA365": 365}
-    mas = {}
-    for name, period in ma_periods.items():
-        mas[name] = round(close.rolling(period).mean().iloc[-1], 2) if len(close) >= period else None
+    # 日线最后两根收盘价即 24h 涨跌的近似
+    change_24h = None
+    if arr.size >= 2:
+        change_24h = round(float((current / arr[-2] - 1) * 100), 2)
 
     change_60d = None
-    if len(close) > 60:
-        change_60d = round((current - close.iloc[-61]) / close.iloc[-61] * 100, 2)
+    if arr.size > 60:
+        change_60d = round(float((current - arr[-61]) / arr[-61] * 100), 2)
 
-    return {"price": round(current, 2), "mas": mas, "change_60d": change_60d}
+    return {"price": round(float(current), 2), "mas": mas,
+            "change_24h": change_24h, "change_60d": change_60d}
 
 
 def calc_ahr999(btc_df: pd.DataFrame) -> float | None:
@@ -86,118 +185,107 @@ def calc_ahr999(btc_df: pd.DataFrame) -> float | None:
     指数增长估值 = 10^(5.84 × log10(币龄天数) - 17.01)
     """
     try:
-        close = btc_df["close"]
-        current = close.iloc[-1]
-        cost_200d = close.iloc[-200:].mean() if len(close) >= 200 else close.mean()
-        days = (datetime.now() - datetime(2009, 1, 3)).days
-        exp_val = 10 ** (5.84 * np.log10(days) - 17.01)
+        arr = btc_df["close"].to_numpy(dtype=np.float64, copy=False)
+        current = arr[-1]
+        cost_200d = arr[-200:].mean()  # 不足 200 天时切片即为全部数据
+        days = date.today().toordinal() - _BTC_GENESIS_ORDINAL
+        exp_val = 10 ** (5.84 * math.log10(days) - 17.01)
         return round(float((current / cost_200d) * (current / exp_val)), 4)
     except Exception as e:
         print(f"  ⚠️ AHR999 计算失败: {e}")
         return None
 
 
-def fetch_fear_greed() -> dict:
+async def fetch_fear_greed(client: httpx.AsyncClient) -> dict:
     """恐慌贪婪指数"""
-    resp = requests.get(ALTME_API, params={"limit": 1}, timeout=10)
-    resp.raise_for_status()
-    d = resp.json()["data"][0]
+    d = orjson.loads(await cached_get(client, ALTME_API, {"limit": 1}, ttl=TTL_FNG))["data"][0]
     return {"value": int(d["value"]), "label": d["value_classification"]}
 
 
-def fetch_binance_funding_rate() -> float | None:
+async def fetch_binance_funding_rate(client: httpx.AsyncClient) -> float | None:
     """Binance BTCUSDT 资金费率"""
     try:
-        r = requests.get(f"{BINANCE_FUTURES}/fapi/v1/premiumIndex",
-                         params={"symbol": "BTCUSDT"}, timeout=10)
-        r.raise_for_status()
-        return round(float(r.json()["lastFundingRate"]) * 100, 4)
+        body = await cached_get(client, f"{BINANCE_FUTURES}/fapi/v1/premiumIndex",
+                                {"symbol": "BTCUSDT"}, ttl=TTL_DERIVS)
+        return round(float(orjson.loads(body)["lastFundingRate"]) * 100, 4)
     except Exception as e:
         print(f"  ⚠️ Binance 资金费率获取失败: {e}")
         return None
 
 
-def fetch_binance_open_interest(btc_price: float) -> dict:
+async def fetch_binance_open_interest(client: httpx.AsyncClient, btc_price: float) -> dict:
     """Binance BTCUSDT 合约持仓"""
     try:
-        r = requests.get(f"{BINANCE_FUTURES}/fapi/v1/openInterest",
-                         params={"symbol": "BTCUSDT"}, timeout=10)
-        r.raise_for_status()
-        oi_btc = float(r.json()["openInterest"])
+        body = await cached_get(client, f"{BINANCE_FUTURES}/fapi/v1/openInterest",
+                                {"symbol": "BTCUSDT"}, ttl=TTL_DERIVS)
+        oi_btc = float(orjson.loads(body)["openInterest"])
         return {"oi_btc": round(oi_btc, 2), "oi_usd": round(oi_btc * btc_price, 2)}
     except Exception as e:
         print(f"  ⚠️ Binance OI 获取失败: {e}")
         return {"oi_btc": None, "oi_usd": None}
 
 
-def fetch_farside_etf() -> dict | None:
+async def fetch_farside_etf(client: httpx.AsyncClient) -> dict | None:
     """从 Farside Investors 获取 BTC ETF 净流入 (单位: 百万美元)"""
     try:
-        r = requests.get("https://farside.co.uk/bitcoin-etf-flow-all-data",
-                         headers=HEADERS, timeout=15)
-        r.raise_for_status()
-        soup = BeautifulSoup(r.text, "lxml")
-        tables = soup.find_all("table")
+        # HTML 较大，缓存时 gzip 压缩以节省 Redis 内存
+        html = await cached_get(client, "https://farside.co.uk/bitcoin-etf-flow-all-data",
+                                ttl=TTL_FARSIDE, compress=True)
+        # HTML 解析是 CPU 密集的，放到线程里，不阻塞事件循环
+        return await asyncio.to_thread(_parse_farside_etf, html)
+    except Exception as e:
+        print(f"  ⚠️ Farside ETF 获取失败: {e}")
+        return None
+
+
+def _parse_flows(col: pd.Series) -> pd.Series:
+    """向量化解析金额列：去掉千分位，括号表示净流出，"-" 和空值记为 0"""
+    text = col.astype(str).str.replace(",", "", regex=False).str.strip()
+    vals = pd.to_numeric(text.str.strip("()"), errors="coerce").fillna(0.0)
+    return vals.where(~text.str.startswith("("), -vals)
+
+
+def _parse_farside_etf(html: bytes) -> dict | None:
+    if HTMLParser is not None:
+        # selectolax 先定位第二个 <table>，read_html 只解析这一小段
+        tables = HTMLParser(html).css("table")
         if len(tables) < 2:
             return None
-
-        table = tables[1]
-        rows = table.find_all("tr")
-
-        # 找表头中的 Total 列索引
-        header_cells = rows[0].find_all(["th", "td"])
-        cols = [h.text.strip() for h in header_cells]
-        total_idx = cols.index("Total") if "Total" in cols else -1
-
-        # 收集数据行 (排除汇总行)
-        data_rows = []
-        for row in rows[1:]:
-            cells = row.find_all("td")
-            if not cells:
-                continue
-            date_text = cells[0].text.strip()
-            if any(x in date_text for x in ["Total", "Average", "Maximum", "Minimum"]):
-                continue
-            data_rows.append(cells)
-
-        if not data_rows:
+        df = pd.read_html(io.StringIO(tables[1].html), flavor="lxml")[0]
+    else:
+        # pd.read_html 直接用 lxml 把表格解析成 DataFrame，不逐个单元格构造 Python 对象
+        tables = pd.read_html(io.BytesIO(html), flavor="lxml")
+        if len(tables) < 2:
             return None
+        df = tables[1]
 
-        latest = data_rows[-1]
-        date_str = latest[0].text.strip()
-
-        # 解析 Total 列
-        def parse_val(text):
-            text = text.replace(",", "").strip()
-            if not text or text == "-":
-                return 0.0
-            if text.startswith("(") and text.endswith(")"):
-                return -float(text[1:-1])
-            return float(text)
+    df.columns = [str(c[0] if isinstance(c, tuple) else c).strip() for c in df.columns]
 
-        if total_idx >= 0 and total_idx < len(latest):
-            total_flow = parse_val(latest[total_idx].text)
-        else:
-            # 手动求和
-            total_flow = sum(parse_val(c.text) for c in latest[1:])
+    # 排除汇总行
+    dates = df.iloc[:, 0].astype(str).str.strip()
+    df = df[df.iloc[:, 0].notna() & ~dates.str.contains("Total|Average|Maximum|Minimum")]
+    if df.empty:
+        return None
 
+    date_str = str(df.iloc[-1, 0]).strip()
+    if "Total" in df.columns:
+        flows = _parse_flows(df["Total"])
+        total_flow = flows.iloc[-1]
         # 最近5天总流入
+        recent_5d = flows.iloc[-5:].sum()
+    else:
+        # 手动求和
+        total_flow = _parse_flows(df.iloc[-1, 1:]).sum()
         recent_5d = 0
-        for row in data_rows[-5:]:
-            if total_idx >= 0 and total_idx < len(row):
-                recent_5d += parse_val(row[total_idx].text)
-
-        return {
-            "date": date_str,
-            "daily_flow_m": round(total_flow, 1),  # 百万美元
-            "recent_5d_flow_m": round(recent_5d, 1),
-        }
-    except Exception as e:
-        print(f"  ⚠️ Farside ETF 获取失败: {e}")
-        return None
 
+    return {
+        "date": date_str,
+        "daily_flow_m": round(float(total_flow), 1),  # 百万美元
+        "recent_5d_flow_m": round(float(recent_5d), 1),
+    }
 
-def fetch_onchain_via_browser() -> dict:
+
+async def fetch_onchain_via_browser() -> dict:
     """
     通过 Playwright 浏览器从 LookIntoBitcoin 提取 NUPL, MVRV, Realized Cap
     页面使用 Plotly.js 渲染图表，数据存储在 DOM 元素的 .data 属性中
@@ -230,50 +318,49 @@ def fetch_onchain_via_browser() -> dict:
     }
 
     try:
-        from playwright.sync_api import sync_playwright
+        from playwright.async_api import async_playwright
     except ImportError:
         print("  ⚠️ Playwright 未安装，跳过链上指标")
         return result
 
+    # 两个图表各开一个标签页并发加载
+    nupl_traces = mvrv_traces = None
     try:
-        with sync_playwright() as p:
-            browser = p.chromium.launch(headless=True)
-            page = browser.new_page()
-
-            # NUPL
-            try:
-                page.goto(charts["nupl"]["url"], timeout=30000)
-                page.wait_for_selector(".js-plotly-plot", timeout=15000)
-                traces = page.evaluate(JS_EXTRACT)
-                if traces:
-                    val = charts["nupl"]["extract"](traces)
-                    if val is not None:
-                        result["nupl"] = round(float(val), 4)
-            except Exception as e:
-                print(f"  ⚠️ NUPL 提取失败: {e}")
-
-            # MVRV
-            try:
-                page.goto(charts["mvrv"]["url"], timeout=30000)
-                page.wait_for_selector(".js-plotly-plot", timeout=15000)
-                traces = page.evaluate(JS_EXTRACT)
-                if traces:
-                    vals = charts["mvrv"]["extract"](traces)
-                    if vals["zscore"] is not None:
-                        result["mvrv_zscore"] = round(float(vals["zscore"]), 4)
-                    if vals["mvrv"] is not None:
-                        result["mvrv"] = round(float(vals["mvrv"]), 4)
-                    if vals["market_cap"] is not None:
-                        result["market_cap"] = vals["market_cap"]
-                    if vals["realized_cap"] is not None:
-                        result["realized_cap"] = vals["realized_cap"]
-            except Exception as e:
-                print(f"  ⚠️ MVRV 提取失败: {e}")
-
-            browser.close()
+        async with async_playwright() as p:
+            browser = await open_browser(p)
+            context = await open_context(browser)
+            nupl_traces, mvrv_traces = await asyncio.gather(
+                grab_plotly_traces(context, charts["nupl"]["url"], JS_EXTRACT),
+                grab_plotly_traces(context, charts["mvrv"]["url"], JS_EXTRACT),
+                return_exceptions=True,
+            )
+            # 对 CDP 连接的常驻浏览器，close() 只断开连接，不会关闭浏览器进程
+            await browser.close()
     except Exception as e:
         print(f"  ⚠️ 浏览器启动失败: {e}")
 
+    # NUPL
+    if isinstance(nupl_traces, Exception):
+        print(f"  ⚠️ NUPL 提取失败: {nupl_traces}")
+    elif nupl_traces:
+        val = charts["nupl"]["extract"](nupl_traces)
+        if val is not None:
+            result["nupl"] = round(float(val), 4)
+
+    # MVRV
+    if isinstance(mvrv_traces, Exception):
+        print(f"  ⚠️ MVRV 提取失败: {mvrv_traces}")
+    elif mvrv_traces:
+        vals = charts["mvrv"]["extract"](mvrv_traces)
+        if vals["zscore"] is not None:
+            result["mvrv_zscore"] = round(float(vals["zscore"]), 4)
+        if vals["mvrv"] is not None:
+            result["mvrv"] = round(float(vals["mvrv"]), 4)
+        if vals["market_cap"] is not None:
+            result["market_cap"] = vals["market_cap"]
+        if vals["realized_cap"] is not None:
+            result["realized_cap"] = vals["realized_cap"]
+
     return result
 
 
@@ -299,6 +386,19 @@ def fmt_val(v, decimals=4):
     return f"{v:.{decimals}f}" if v is not None else "N/A"
 
 
+MA_NAMES = list(MA_PERIODS)
+
+
+def _ma_rows(price, mas) -> str:
+    """均线表格行：每条均线只查一次、只格式化一次"""
+    rows = []
+    for name in MA_NAMES:
+        val = mas.get(name)
+        diff_s = f" ({(price - val) / val * 100:+.1f}%)" if val else ""
+        rows.append(f"| {name} | {fmt_price(val)}{diff_s} |")
+    return "\n".join(rows)
+
+
 def generate_report(btc, eth, fng, etf, oi, funding_rate, onchain) -> str:
     """生成 Markdown 日报"""
     now = datetime.now(CST)
@@ -306,72 +406,26 @@ def generate_report(btc, eth, fng, etf, oi, funding_rate, onchain) -> str:
     btc_ma200 = btc["mas"].get("MA200")
     ahr999 = onchain.get("ahr999")
 
-    lines = [
-        f"# 📊 加密货币每日决策日报",
-        f"**日期**: {now.strftime('%Y-%m-%d')}　**更新时间**: {now.strftime('%H:%M')} CST\n",
-    ]
-
-    # ── BTC ──
-    lines.append("## BTC 行情概览\n")
-    lines.append("| 指标 | 数值 |")
-    lines.append("|------|------|")
-    lines.append(f"| 当前价格 | {fmt_price(btc_price)} |")
-    for name in ["MA30", "MA40", "MA120", "MA200", "MA365"]:
-        val = btc["mas"].get(name)
-        diff = f" ({(btc_price - val) / val * 100:+.1f}%)" if val else ""
-        lines.append(f"| {name} | {fmt_price(val)}{diff} |")
-    lines.append(f"| 60日涨幅 | {fmt_pct(btc['change_60d'])} |")
-
-    # ── ETH ──
-    lines.append("\n## ETH 行情概览\n")
-    lines.append("| 指标 | 数值 |")
-    lines.append("|------|------|")
-    lines.append(f"| 当前价格 | {fmt_price(eth['price'])} |")
-    for name in ["MA30", "MA40", "MA120", "MA200", "MA365"]:
-        val = eth["mas"].get(name)
-        diff = f" ({(eth['price'] - val) / val * 100:+.1f}%)" if val else ""
-        lines.append(f"| {name} | {fmt_price(val)}{diff} |")
-    lines.append(f"| 60日涨幅 | {fmt_pct(eth['change_60d'])} |")
-
-    # ── 市场情绪与资金 ──
-    lines.append("\n## 市场情绪与资金\n")
-    lines.append("| 指标 | 数值 |")
-    lines.append("|------|------|")
-    lines.append(f"| 恐慌贪婪指数 | {fng['value']} ({fng['label']}) |")
+    btc_ma_rows = _ma_rows(btc_price, btc["mas"])
+    eth_ma_rows = _ma_rows(eth["price"], eth["mas"])
 
     if etf:
-        lines.append(f"| BTC ETF 日净流入 | {fmt_flow(etf['daily_flow_m'])} ({etf['date']}) |")
-        lines.append(f"| BTC ETF 近5日净流入 | {fmt_flow(etf['recent_5d_flow_m'])} |")
+        etf_rows = (f"| BTC ETF 日净流入 | {fmt_flow(etf['daily_flow_m'])} ({etf['date']}) |\n"
+                    f"| BTC ETF 近5日净流入 | {fmt_flow(etf['recent_5d_flow_m'])} |")
     else:
-        lines.append("| BTC ETF 净流入 | N/A |")
-
-    lines.append(f"| Binance BTC 合约持仓 | {fmt_oi(oi.get('oi_usd'))} ({fmt_val(oi.get('oi_btc'), 0)} BTC) |")
+        etf_rows = "| BTC ETF 净流入 | N/A |"
 
     fr_str = f"{funding_rate}%" if funding_rate is not None else "N/A"
-    lines.append(f"| Binance 资金费率 | {fr_str} |")
-
-    # ── 链上指标 ──
-    lines.append("\n## 链上指标\n")
-    lines.append("| 指标 | 数值 | 参考区间 |")
-    lines.append("|------|------|----------|")
-    lines.append(f"| AHR999 | {fmt_val(ahr999)} | <0.45 抄底, 0.45-1.2 定投, >1.2 观望 |")
-
-    nupl = onchain.get("nupl")
-    lines.append(f"| NUPL | {fmt_val(nupl)} | <0 投降, 0-0.25 希望, 0.25-0.5 乐观, >0.75 贪婪 |")
-
-    mvrv = onchain.get("mvrv_zscore")
-    lines.append(f"| MVRV Z-Score | {fmt_val(mvrv)} | <0 低估, 0-2 正常, >7 高估 |")
 
+    extra_onchain = ""
     mvrv_raw = onchain.get("mvrv")
     if mvrv_raw is not None:
-        lines.append(f"| MVRV | {fmt_val(mvrv_raw)} |  |")
-
+        extra_onchain += f"\n| MVRV | {fmt_val(mvrv_raw)} |  |"
     mc = onchain.get("market_cap")
     if mc:
-        lines.append(f"| BTC 总市值 | ${mc/1e12:.2f}T |  |")
+        extra_onchain += f"\n| BTC 总市值 | ${mc/1e12:.2f}T |  |"
 
     # ── 系统判断 ──
-    lines.append("\n## 系统判断\n")
     signals = []
 
     if btc_ma200:
@@ -408,73 +462,113 @@ def generate_report(btc, eth, fng, etf, oi, funding_rate, onchain) -> str:
         elif etf["recent_5d_flow_m"] > 500:
             signals.append(f"🔺 ETF 近5日大幅净流入 ({fmt_flow(etf['recent_5d_flow_m'])})")
 
-    for s in signals:
-        lines.append(f"- {s}")
+    signal_lines = "\n".join(f"- {s}" for s in signals)
 
     # 极高胜率区间
+    high_prob = ""
     if ahr999 is not None and btc_ma200 is not None:
         if ahr999 < 0.45 and btc_price < btc_ma200:
-            lines.append("")
-            lines.append("> 🚨 **系统进入极高胜率区间** — AHR999 < 0.45 且价格低于 MA200，"
+            high_prob = ("\n\n> 🚨 **系统进入极高胜率区间** — AHR999 < 0.45 且价格低于 MA200，"
                          "历史上此区间买入持有1年以上胜率极高。")
 
-    lines.append(f"\n---\n*数据仅供参考，不构成投资建议。*")
-    return "\n".join(lines)
+    return f"""# 📊 加密货币每日决策日报
+**日期**: {now:%Y-%m-%d}　**更新时间**: {now:%H:%M} CST
+
+## BTC 行情概览
+
+| 指标 | 数值 |
+|------|------|
+| 当前价格 | {fmt_price(btc_price)} |
+{btc_ma_rows}
+| 60日涨幅 | {fmt_pct(btc['change_60d'])} |
+
+## ETH 行情概览
+
+| 指标 | 数值 |
+|------|------|
+| 当前价格 | {fmt_price(eth['price'])} |
+{eth_ma_rows}
+| 60日涨幅 | {fmt_pct(eth['change_60d'])} |
+
+## 市场情绪与资金
+
+| 指标 | 数值 |
+|------|------|
+| 恐慌贪婪指数 | {fng['value']} ({fng['label']}) |
+{etf_rows}
+| Binance BTC 合约持仓 | {fmt_oi(oi.get('oi_usd'))} ({fmt_val(oi.get('oi_btc'), 0)} BTC) |
+| Binance 资金费率 | {fr_str} |
+
+## 链上指标
+
+| 指标 | 数值 | 参考区间 |
+|------|------|----------|
+| AHR999 | {fmt_val(ahr999)} | <0.45 抄底, 0.45-1.2 定投, >1.2 观望 |
+| NUPL | {fmt_val(onchain.get('nupl'))} | <0 投降, 0-0.25 希望, 0.25-0.5 乐观, >0.75 贪婪 |
+| MVRV Z-Score | {fmt_val(onchain.get('mvrv_zscore'))} | <0 低估, 0-2 正常, >7 高估 |{extra_onchain}
+
+## 系统判断
+
+{signal_lines}{high_prob}
+
+---
+*数据仅供参考，不构成投资建议。*"""
 
 
 # ═══════════════════════════════════════════════════════════
 # 主流程
 # ═══════════════════════════════════════════════════════════
 
-def main():
+async def main():
     print("🚀 开始采集数据...\n")
+    enable_redis_cache()
+
+    print("📡 并发获取 BTC/ETH 日线、恐慌贪婪指数、ETF 净流入、资金费率、NUPL/MVRV...")
+    async with make_client() as client:
+        btc_df, eth_df, fng, etf, funding, onchain = await asyncio.gather(
+            fetch_binance_klines(client, "BTCUSDT", 365),
+            fetch_binance_klines(client, "ETHUSDT", 365),
+            fetch_fear_greed(client),
+            fetch_farside_etf(client),
+            fetch_binance_funding_rate(client),
+            fetch_onchain_via_browser(),
+        )
+        btc = calc_indicators(btc_df)
+        eth = calc_indicators(eth_df)
+
+        print("📊 获取 Binance 合约持仓...")
+        oi = await fetch_binance_open_interest(client, btc["price"])
 
-    print("📈 获取 BTC 日线...")
-    btc_df = fetch_binance_klines("BTCUSDT", 365)
-    btc = calc_indicators(btc_df)
     print(f"   BTC: ${btc['price']:,.2f}")
-
-    print("📈 获取 ETH 日线...")
-    eth_df = fetch_binance_klines("ETHUSDT", 365)
-    eth = calc_indicators(eth_df)
     print(f"   ETH: ${eth['price']:,.2f}")
-
-    print("😱 获取恐慌贪婪指数...")
-    fng = fetch_fear_greed()
     print(f"   FGI: {fng['value']} ({fng['label']})")
-
-    print("📊 获取 BTC ETF 净流入 (Farside)...")
-    etf = fetch_farside_etf()
     if etf:
         print(f"   ETF: {etf['date']} → {etf['daily_flow_m']:+.1f}M, 近5日: {etf['recent_5d_flow_m']:+.1f}M")
     else:
         print("   ETF: 获取失败")
-
-    print("📊 获取 Binance 合约持仓...")
-    oi = fetch_binance_open_interest(btc["price"])
     print(f"   OI: {oi}")
-
-    print("📊 获取 Binance 资金费率...")
-    funding = fetch_binance_funding_rate()
     print(f"   Funding: {funding}%")
 
     print("⛓️ 计算 AHR999...")
     ahr999 = calc_ahr999(btc_df)
     print(f"   AHR999: {ahr999}")
 
-    print("⛓️ 获取 NUPL/MVRV (浏览器提取)...")
-    onchain = fetch_onchain_via_browser()
     onchain["ahr999"] = ahr999
     print(f"   NUPL: {onchain.get('nupl')}, MVRV Z-Score: {onchain.get('mvrv_zscore')}")
 
     print("\n📝 生成日报...")
     report = generate_report(btc, eth, fng, etf, oi, funding, onchain)
 
-    out_dir = Path(__file__).parent / "reports"
-    out_dir.mkdir(exist_ok=True)
+    REPORTS_DIR.mkdir(parents=True, exist_ok=True)
     filename = f"report_{datetime.now(CST).strftime('%Y%m%d_%H%M')}.md"
-    out_path = out_dir / filename
-    out_path.write_text(report, encoding="utf-8")
+    out_path = REPORTS_DIR / filename
+    # 先写临时文件再原子替换，中途崩溃也不会留下半截日报
+    tmp = out_path.with_suffix(".md.tmp")
+    try:
+        tmp.write_bytes(report.encode("utf-8"))
+        os.replace(tmp, out_path)
+    finally:
+        tmp.unlink(missing_ok=True)  # 替换成功后已不存在；写入失败时清掉残留
 
     print(f"\n✅ 日报已保存: {out_path}")
     print("\n" + "=" * 60)
@@ -483,4 +577,8 @@ def main():
 
 
 if __name__ == "__main__":
-    main()
+    import sys
+    if "--serve-browser" in sys.argv:
+        serve_browser()
+    else:
+        asyncio.run(main())
@@ -2,16 +2,45 @@
 """
 定时采集 NUPL/MVRV 数据（需要 Playwright）
 运行后将数据写入 data/onchain.json 并推送到 GitHub
+若已用 `python crypto_report.py --serve-browser` 启动常驻浏览器，会通过 CDP 复用它
 """
+import asyncio
 import json
 import subprocess
 from datetime import datetime, timezone, timedelta
 from pathlib import Path
 
+from browser import grab_plotly_traces, open_browser, open_context
+
+try:
+    import orjson
+except ImportError:  # 采集机只需 Playwright；没装 orjson 时退回标准库，输出字节一致
+    orjson = None
+
 CST = timezone(timedelta(hours=8))
+ONCHAIN_FILE = "data/onchain.json"
+METRIC_FIELDS = ("nupl", "mvrv", "mvrv_zscore", "market_cap", "realized_cap")
+
+
+def metrics_unchanged(path, data):
+    """与已有 onchain.json 比较指标字段；updated_at 每次都变，不参与比较"""
+    try:
+        old = json.loads(path.read_bytes())
+    except (OSError, ValueError):
+        return False
+    return all(old.get(k) == data.get(k) for k in METRIC_FIELDS)
+
 
-def fetch_onchain():
-    from playwright.sync_api import sync_playwright
+def git(repo_dir, *args):
+    """运行一条 git 命令，只在失败时打印 stderr"""
+    proc = subprocess.run(["git", "-C", str(repo_dir), *args], capture_output=True, text=True)
+    if proc.returncode != 0:
+        print(f"git {args[0]} 失败: {proc.stderr.strip()}")
+    return proc
+
+
+async def fetch_onchain():
+    from playwright.async_api import async_playwright
 
     JS_EXTRACT = '''() => {
         const plot = document.querySelector(".js-plotly-plot");
@@ -22,65 +51,68 @@ def fetch_onchain():
     result = {"nupl": None, "mvrv": None, "mvrv_zscore": None,
               "market_cap": None, "realized_cap": None}
 
-    with sync_playwright() as p:
-        browser = p.chromium.launch(headless=True)
-        page = browser.new_page()
-
-        # NUPL
-        try:
-            page.goto("https://www.lookintobitcoin.com/charts/relative-unrealized-profit--loss/",
-                       wait_until="networkidle", timeout=30000)
-            page.wait_for_selector(".js-plotly-plot", timeout=10000)
-            traces = page.evaluate(JS_EXTRACT)
-            if traces:
-                for t in traces:
-                    if t.get("name") and "NUPL" in t["name"].upper():
-                        result["nupl"] = round(float(t["lastY"]), 4) if t["lastY"] else None
-                        break
-        except Exception as e:
-            print(f"NUPL error: {e}")
-
-        # MVRV
-        try:
-            page.goto("https://www.lookintobitcoin.com/charts/mvrv-zscore/",
-                       wait_until="networkidle", timeout=30000)
-            page.wait_for_selector(".js-plotly-plot", timeout=10000)
-            traces = page.evaluate(JS_EXTRACT)
-            if traces:
-                for t in traces:
-                    name = t.get("name", "")
-                    val = t.get("lastY")
-                    if val is not None:
-                        if name == "Z-Score":
-                            result["mvrv_zscore"] = round(float(val), 4)
-                        elif name == "MVRV":
-                            result["mvrv"] = round(float(val), 4)
-                        elif name == "Market Cap":
-                            result["market_cap"] = float(val)
-                        elif name == "Realized Cap":
-                            result["realized_cap"] = float(val)
-        except Exception as e:
-            print(f"MVRV error: {e}")
-
-        browser.close()
+    async with async_playwright() as p:
+        browser = await open_browser(p)
+        context = await open_context(browser)
+        # 两个图表各开一个标签页并发加载
+        nupl_traces, mvrv_traces = await asyncio.gather(
+            grab_plotly_traces(context, "https://www.lookintobitcoin.com/charts/relative-unrealized-profit--loss/",
+                               JS_EXTRACT),
+            grab_plotly_traces(context, "https://www.lookintobitcoin.com/charts/mvrv-zscore/", JS_EXTRACT),
+            return_exceptions=True,
+        )
+        await browser.close()
+
+    # NUPL
+    if isinstance(nupl_traces, Exception):
+        print(f"NUPL error: {nupl_traces}")
+    elif nupl_traces:
+        for t in nupl_traces:
+            if t.get("name") and "NUPL" in t["name"].upper():
+                result["nupl"] = round(float(t["lastY"]), 4) if t["lastY"] else None
+                break
+
+    # MVRV
+    if isinstance(mvrv_traces, Exception):
+        print(f"MVRV error: {mvrv_traces}")
+    elif mvrv_traces:
+        for t in mvrv_traces:
+            name = t.get("name", "")
+            val = t.get("lastY")
+            if val is not None:
+                if name == "Z-Score":
+                    result["mvrv_zscore"] = round(float(val), 4)
+                elif name == "MVRV":
+                    result["mvrv"] = round(float(val), 4)
+                elif name == "Market Cap":
+                    result["market_cap"] = float(val)
+                elif name == "Realized Cap":
+                    result["realized_cap"] = float(val)
 
     return result
 
 if __name__ == "__main__":
     print("📡 采集链上数据...")
-    data = fetch_onchain()
+    data = asyncio.run(fetch_onchain())
     data["updated_at"] = datetime.now(CST).strftime("%Y-%m-%d %H:%M CST")
     print(f"   NUPL: {data['nupl']}, MVRV Z-Score: {data['mvrv_zscore']}")
 
-    out = Path(__file__).parent / "data" / "onchain.json"
-    out.parent.mkdir(exist_ok=True)
-    out.write_text(json.dumps(data, indent=2, ensure_ascii=False))
-    print(f"✅ 已保存到 {out}")
-
-    # 推送到 GitHub
-    repo_dir = Path(__file__).parent
-    subprocess.run(["git", "add", "data/onchain.json"], cwd=repo_dir)
-    subprocess.run(["git", "commit", "-m", f"data: 更新链上数据 {data['updated_at']}"],
-                   cwd=repo_dir, capture_output=True)
-    subprocess.run(["git", "push"], cwd=repo_dir, capture_output=True)
-    print("✅ 已推送到 GitHub")
+    out = Path(__file__).parent / ONCHAIN_FILE
+    if metrics_unchanged(out, data):
+        print("ℹ️ 数据无变化，跳过写入和推送")
+    else:
+        out.parent.mkdir(exist_ok=True)
+        if orjson is not None:
+            out.write_bytes(orjson.dumps(data, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS))
+        else:
+            out.write_text(json.dumps(data, indent=2, ensure_ascii=False), encoding="utf-8")
+        print(f"✅ 已保存到 {out}")
+
+        # 推送到 GitHub：首次生成的文件尚未被跟踪，需要先 add；已跟踪的直接按路径提交
+        repo_dir = Path(__file__).parent
+        status = git(repo_dir, "status", "--porcelain", "--", ONCHAIN_FILE)
+        if status.stdout.startswith("??"):
+            git(repo_dir, "add", "--", ONCHAIN_FILE)
+        commit = git(repo_dir, "commit", "-m", f"data: 更新链上数据 {data['updated_at']}", "--", ONCHAIN_FILE)
+        if commit.returncode == 0 and git(repo_dir, "push", "--quiet").returncode == 0:
+            print("✅ 已推送到 GitHub")